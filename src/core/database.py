@@ -1,29 +1,179 @@
 # src/core/database.py
+import atexit
+import itertools
+import os
 import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from dataclasses import replace
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
 from loguru import logger
-from models import PasswordEntry
+from .models import PasswordEntry
 
 # Configuração do banco de dados
-DB_PATH = Path(__file__).parent.parent / "data" / "vault.db"
+# PASSWORLD_DB sobrescreve o caminho; em testes/CI use ":memory:" para evitar I/O em disco.
+# Em memória tudo passa por uma única conexão (leituras e escritas): sem WAL nem leitores
+# concorrentes, e leituras de outras threads enxergam uma transação de escrita em andamento.
+DB_PATH = os.getenv("PASSWORLD_DB", str(Path(__file__).parent.parent / "data" / "vault.db"))
+MEMORY_DB = ":memory:"
 
-def get_connection() -> sqlite3.Connection:
-    """Retorna uma conexão com o banco de dados, com tratamento de erro."""
+# SQL fixo: o mesmo texto a cada chamada garante acerto no cache de statements do sqlite3
+INSERT_SQL = """
+    INSERT INTO passwords (service, username, encrypted_password)
+    VALUES (?, ?, ?)
+"""
+# RETURNING (SQLite >= 3.35) devolve os campos gerados sem um SELECT extra
+INSERT_RETURNING_SQL = INSERT_SQL + "RETURNING created_at"
+_SELECT_SQL = "SELECT service, username, encrypted_password, created_at FROM passwords"
+# ORDER BY service acompanha o índice (service, username): saída ordenada sem sort extra
+SELECT_ALL_SQL = _SELECT_SQL + " ORDER BY service"
+SELECT_BY_SERVICE_SQL = _SELECT_SQL + " WHERE service = ? ORDER BY service"
+SELECT_BY_USERNAME_SQL = _SELECT_SQL + " WHERE username = ? ORDER BY service"
+UPDATE_SQL = """
+    UPDATE passwords
+    SET service = ?, username = ?, encrypted_password = ?
+    WHERE service = ?
+    RETURNING created_at
+"""
+DELETE_SQL = "DELETE FROM passwords WHERE service = ?"
+
+# Conversor registrado uma vez: colunas TIMESTAMP já chegam como datetime
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+
+# A cada N escritas confirmadas, atualiza as estatísticas do planejador
+OPTIMIZE_EVERY = 1000
+_commit_counter = itertools.count(1)
+
+# Leituras: uma conexão por thread (o WAL permite leitores concorrentes).
+# Escritas: uma única conexão, serializada por _write_lock. Em memória, só esta última.
+_local = threading.local()
+_write_lock = threading.Lock()
+_write_conn: Optional[sqlite3.Connection] = None
+
+def _connect() -> sqlite3.Connection:
+    """Abre uma conexão configurada com o banco de dados, com tratamento de erro."""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = sqlite3.connect(
+            DB_PATH, check_same_thread=False, isolation_level=None, cached_statements=256,
+            detect_types=sqlite3.PARSE_DECLTYPES
+        )
         conn.row_factory = sqlite3.Row  # Acessar colunas por nome
         conn.execute("PRAGMA foreign_keys = ON")  # Ativa chaves estrangeiras
+        conn.execute("PRAGMA synchronous = NORMAL")  # Seguro com WAL, menos fsyncs
+        conn.execute("PRAGMA temp_store = MEMORY")  # Tabelas temporárias em memória
+        conn.execute("PRAGMA cache_size = -64000")  # Cache de páginas de ~64MB
+        conn.execute("PRAGMA mmap_size = 268435456")  # Leitura via mmap (256MB)
         return conn
     except sqlite3.Error as e:
         logger.critical(f"Falha ao conectar ao banco de dados: {e}")
         raise
 
+def _connect_reader() -> sqlite3.Connection:
+    """Abre uma conexão somente leitura (o schema já deve existir)."""
+    conn = _connect()
+    conn.execute("PRAGMA query_only = ON")  # Escritas só pela conexão de escrita
+    return conn
+
+def _get_conn() -> sqlite3.Connection:
+    """Retorna a conexão de leitura da thread atual, criando-a na primeira chamada."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+    ensure_schema()
+    if DB_PATH == MEMORY_DB:
+        # Cada conexão ":memory:" seria outro banco, e o shared cache trava por tabela:
+        # em memória a conexão de escrita também atende as leituras
+        conn = _write_conn
+    else:
+        conn = _connect_reader()
+        # Fecha junto com a thread (e no encerramento, se ela ainda existir), sem acumular no atexit
+        weakref.finalize(threading.current_thread(), conn.close)
+    _local.conn = conn
+    return conn
+
+def _get_write_conn() -> sqlite3.Connection:
+    """Retorna a conexão de escrita, criando-a (e o schema) na primeira chamada.
+
+    Deve ser chamada com _write_lock adquirido.
+    """
+    global _write_conn
+    if _write_conn is not None:
+        return _write_conn
+    conn = _connect()
+    try:
+        _create_schema(conn)
+    except sqlite3.Error:
+        conn.close()  # Sem schema, a próxima chamada tenta de novo
+        raise
+    _write_conn = conn
+    atexit.register(_close_conn, conn)
+    return conn
+
+@contextmanager
+def _atomic(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Executa o bloco dentro de BEGIN/COMMIT, com ROLLBACK em caso de erro (inclusive no COMMIT)."""
+    conn.execute("BEGIN IMMEDIATE")  # Trava de escrita já no início: esperas passam pelo busy timeout
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:  # Evita que um ROLLBACK inválido esconda o erro original
+            conn.execute("ROLLBACK")
+        raise
+
+@contextmanager
+def _transaction() -> Iterator[sqlite3.Connection]:
+    """Transação de escrita: serializada por _write_lock na conexão de escrita."""
+    with _write_lock:
+        conn = _get_write_conn()
+        try:
+            with _atomic(conn):
+                yield conn
+        finally:
+            # Após o COMMIT, para nenhum leitor recachear o estado antigo; e também após o
+            # ROLLBACK, pois em memória leitores usam esta conexão e podem ter cacheado
+            # linhas que nunca foram confirmadas
+            _invalidate_cache()
+        if next(_commit_counter) % OPTIMIZE_EVERY == 0:
+            _optimize(conn)
+
+def _optimize(conn: sqlite3.Connection) -> None:
+    """Executa PRAGMA optimize; falhas aqui nunca devem derrubar a operação."""
+    try:
+        conn.execute("PRAGMA optimize")
+    except sqlite3.Error as e:
+        logger.warning(f"Falha ao executar PRAGMA optimize: {e}")
+
+def _close_conn(conn: sqlite3.Connection) -> None:
+    """Encerramento gracioso da conexão de escrita: otimiza as estatísticas e fecha."""
+    _optimize(conn)
+    conn.close()
+
+def ensure_schema() -> None:
+    """Garante o schema uma única vez por processo, ao abrir a conexão de escrita (não no import)."""
+    if _write_conn is not None:
+        # Já pronto: não toca no _write_lock, que pode estar com esta mesma thread
+        # (ex.: leitura dentro do gerador consumido por create_passwords)
+        return
+    try:
+        with _write_lock:
+            _get_write_conn()
+    except Exception as e:
+        logger.critical(f"Falha crítica ao inicializar banco de dados: {e}")
+        raise
+
 def init_db() -> None:
-    """Inicializa o banco de dados com tratamento de erro e logging."""
+    """Inicializa o banco de dados (idempotente); equivale a ensure_schema()."""
+    ensure_schema()
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    """Cria tabela e índices na conexão de escrita, com tratamento de erro e logging."""
     try:
-        with get_connection() as conn:
+        with _atomic(conn):
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS passwords (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -33,28 +183,58 @@ def init_db() -> None:
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_service ON passwords (service)")
+            duplicates = _find_duplicates(conn)
+            if duplicates:
+                # Vaults antigos (sem restrição) podem ter duplicatas: o índice único falharia
+                # e derrubaria todo acesso ao banco; segue sem ele até as duplicatas saírem
+                listing = ", ".join(
+                    f"'{row['service']}'/'{row['username']}' ({row['total']}x)" for row in duplicates
+                )
+                logger.warning(
+                    f"Entradas duplicadas (serviço/usuário): {listing}. Remova as cópias extras "
+                    "para ativar o índice único idx_service_user; até lá duplicatas não são bloqueadas"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_service ON passwords (service)")
+            else:
+                # Índice composto único: garante o IntegrityError em duplicatas e cobre buscas por serviço
+                conn.execute(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS idx_service_user ON passwords (service, username)"
+                )
+                conn.execute("DROP INDEX IF EXISTS idx_service")  # Redundante com idx_service_user
             conn.execute("CREATE INDEX IF NOT EXISTS idx_username ON passwords (username)")
+        if DB_PATH != MEMORY_DB:  # WAL não se aplica a bancos em memória
+            conn.execute("PRAGMA journal_mode = WAL")  # Persistente no cabeçalho do banco
+        conn.execute("PRAGMA optimize")  # Estatísticas iniciais para o planejador
         logger.info("Banco de dados inicializado com sucesso")
     except sqlite3.Error as e:
         logger.error(f"Erro ao inicializar banco de dados: {e}")
         raise
 
+def _find_duplicates(conn: sqlite3.Connection) -> List[sqlite3.Row]:
+    """Lista pares (serviço, usuário) repetidos; só varre a tabela enquanto o índice único não existe."""
+    has_unique_index = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_service_user'"
+    ).fetchone()
+    if has_unique_index:
+        return []
+    return conn.execute("""
+        SELECT service, username, COUNT(*) AS total FROM passwords
+        GROUP BY service, username HAVING COUNT(*) > 1
+    """).fetchall()
+
 # --- Operações CRUD com Tratamento de Erros ---
 def create_password(entry: PasswordEntry) -> bool:
     """Adiciona uma nova senha ao banco de dados. Retorna True se bem-sucedido."""
     try:
-        with get_connection() as conn:
-            cursor = conn.execute(
-                """
-                INSERT INTO passwords (service, username, encrypted_password)
-                VALUES (?, ?, ?)
-                """,
+        with _transaction() as conn:
+            row = conn.execute(
+                INSERT_RETURNING_SQL,
                 (entry.service, entry.username, entry.encrypted_password)
-            )
-            conn.commit()
-            logger.success(f"Senha criada para {entry.service} (usuário: {entry.username})")
-            return cursor.rowcount > 0
+            ).fetchone()
+        entry.created_at = row["created_at"]  # Só após o COMMIT
+        # Argumentos posicionais: o loguru só formata se algum sink aceitar o nível
+        logger.success("Senha criada para {} (usuário: {})", entry.service, entry.username)
+        return True
     except sqlite3.IntegrityError:
         logger.warning(f"Serviço '{entry.service}' já existe para o usuário '{entry.username}'")
         return False
@@ -62,94 +242,158 @@ def create_password(entry: PasswordEntry) -> bool:
         logger.error(f"Erro ao criar senha: {e}")
         return False
 
+def create_passwords(entries: Iterable[PasswordEntry]) -> int:
+    """Adiciona várias senhas em uma única transação. Retorna quantas foram inseridas."""
+    try:
+        with _transaction() as conn:
+            cursor = conn.executemany(
+                INSERT_SQL,
+                ((e.service, e.username, e.encrypted_password) for e in entries)
+            )
+            logger.success("{} senhas criadas em lote", cursor.rowcount)
+            return cursor.rowcount
+    except sqlite3.IntegrityError as e:
+        logger.warning(f"Importação em lote cancelada por entrada duplicada: {e}")
+        return 0
+    except sqlite3.Error as e:
+        logger.error(f"Erro ao criar senhas em lote: {e}")
+        return 0
+
+def _entries(
+    sql: str, params: Tuple = (), conn: Optional[sqlite3.Connection] = None
+) -> sqlite3.Cursor:
+    """Executa a consulta num cursor cujas linhas já saem como PasswordEntry."""
+    cursor = (conn or _get_conn()).cursor()
+    cursor.row_factory = PasswordEntry.from_row  # Só neste cursor; as APIs cruas seguem com sqlite3.Row
+    return cursor.execute(sql, params)
+
+def iter_passwords() -> Iterator[PasswordEntry]:
+    """Percorre as senhas salvas sob demanda, sem carregar o resultado inteiro na memória.
+
+    Usa uma conexão própria, para não fixar o snapshot das demais leituras da thread.
+    Enquanto não for esgotado ou fechado (close()), o gerador mantém uma transação de
+    leitura aberta, o que impede checkpoints do WAL. Falha ao abrir a leitura resulta em
+    nenhuma entrada; erro no meio da leitura é propagado, para não passar um resultado
+    truncado por completo (ex.: em exportação/backup).
+    """
+    in_memory = DB_PATH == MEMORY_DB
+    conn = None
+    try:
+        if _write_conn is None:  # Só na primeira vez: ensure_schema usa o _write_lock
+            ensure_schema()
+        # Em memória só existe a conexão compartilhada (ver DB_PATH)
+        conn = _get_conn() if in_memory else _connect_reader()
+        cursor = _entries(SELECT_ALL_SQL, conn=conn)
+    except sqlite3.Error as e:
+        logger.error(f"Erro ao ler senhas: {e}")
+        if conn is not None and not in_memory:
+            conn.close()
+        return
+    try:
+        yield from cursor
+    except sqlite3.Error as e:
+        logger.error(f"Leitura de senhas interrompida: {e}")
+        raise
+    finally:
+        if not in_memory:
+            conn.close()
+
 def read_all_passwords() -> List[PasswordEntry]:
     """Retorna todas as senhas salvas ou lista vazia em caso de erro."""
     try:
-        with get_connection() as conn:
-            cursor = conn.execute(
-                "SELECT service, username, encrypted_password, created_at FROM passwords"
-            )
-            return [
-                PasswordEntry(
-                    service=row["service"],
-                    username=row["username"],
-                    encrypted_password=row["encrypted_password"],
-                    created_at=datetime.fromisoformat(row["created_at"])
-                ) for row in cursor.fetchall()
-            ]
+        return _entries(SELECT_ALL_SQL).fetchall()
     except sqlite3.Error as e:
         logger.error(f"Erro ao ler senhas: {e}")
         return []
 
+def read_all_rows() -> List[sqlite3.Row]:
+    """Retorna as linhas cruas (acesso por nome, ex.: row["service"]) para listagens da interface."""
+    try:
+        return _get_conn().execute(SELECT_ALL_SQL).fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Erro ao ler senhas: {e}")
+        return []
+
+def read_all_columns() -> Dict[str, list]:
+    """Retorna todas as senhas em colunas paralelas (uma lista por campo), sem objetos por linha."""
+    columns = ("service", "username", "encrypted_password", "created_at")
+    try:
+        conn = _get_conn()
+        rows = conn.execute(SELECT_ALL_SQL).fetchall()
+        if not rows:
+            return {name: [] for name in columns}
+        return {name: list(values) for name, values in zip(columns, zip(*rows))}
+    except sqlite3.Error as e:
+        logger.error(f"Erro ao ler senhas: {e}")
+        return {name: [] for name in columns}
+
+# Geração do cache: entra na chave das buscas e avança a cada escrita confirmada. Uma busca
+# que começou antes do COMMIT grava sob a geração antiga, que nunca mais é consultada.
+_cache_generation = 0
+
+@lru_cache(maxsize=128)
+def _lookup_by_service(service: str, generation: int) -> Optional[PasswordEntry]:
+    """Consulta cacheada por serviço; erros propagam e, por isso, não entram no cache."""
+    return _entries(SELECT_BY_SERVICE_SQL, (service,)).fetchone()
+
+@lru_cache(maxsize=128)
+def _lookup_by_username(username: str, generation: int) -> Optional[PasswordEntry]:
+    """Consulta cacheada por username; erros propagam e, por isso, não entram no cache."""
+    return _entries(SELECT_BY_USERNAME_SQL, (username,)).fetchone()
+
+def _invalidate_cache() -> None:
+    """Descarta as buscas cacheadas; chamado a cada escrita confirmada (com _write_lock)."""
+    global _cache_generation
+    _cache_generation += 1
+    _lookup_by_service.cache_clear()
+    _lookup_by_username.cache_clear()
+
 def read_password_by_service(service: str) -> Optional[PasswordEntry]:
     """Busca uma senha pelo serviço. Retorna None se não encontrada ou em erro."""
     try:
-        with get_connection() as conn:
-            cursor = conn.execute(
-                """
-                SELECT service, username, encrypted_password, created_at 
-                FROM passwords WHERE service = ?
-                """,
-                (service,)
-            )
-            row = cursor.fetchone()
-            if row:
-                return PasswordEntry(
-                    service=row["service"],
-                    username=row["username"],
-                    encrypted_password=row["encrypted_password"],
-                    created_at=datetime.fromisoformat(row["created_at"])
-                )
-            logger.debug(f"Serviço '{service}' não encontrado")
-            return None
+        entry = _lookup_by_service(service, _cache_generation)
+    except sqlite3.Error as e:
+        logger.error(f"Erro ao buscar serviço '{service}': {e}")
+        return None
+    if entry is None:
+        logger.debug("Serviço '{}' não encontrado", service)
+        return None
+    return replace(entry)  # Cópia: alterar o retorno não pode contaminar o cache
+
+def read_row_by_service(service: str) -> Optional[sqlite3.Row]:
+    """Busca a linha crua de um serviço. Retorna None se não encontrada ou em erro."""
+    try:
+        return _get_conn().execute(SELECT_BY_SERVICE_SQL, (service,)).fetchone()
     except sqlite3.Error as e:
         logger.error(f"Erro ao buscar serviço '{service}': {e}")
         return None
-    
+
 def read_password_by_username(username: str) -> Optional[PasswordEntry]:
     """Busca uma senha pelo username. Retorna None se não encontrada ou em erro."""
     try:
-        with get_connection() as conn:
-            cursor = conn.execute(
-                """
-                SELECT service, username, encrypted_password, created_at 
-                FROM passwords WHERE username = ?
-                """,
-                (username,)
-            )
-            row = cursor.fetchone()
-            if row:
-                return PasswordEntry(
-                    service=row["service"],
-                    username=row["username"],
-                    encrypted_password=row["encrypted_password"],
-                    created_at=datetime.fromisoformat(row["created_at"])
-                )
-            logger.debug(f"Username '{username}' não encontrado")
-            return None
+        entry = _lookup_by_username(username, _cache_generation)
     except sqlite3.Error as e:
         logger.error(f"Erro ao buscar Username '{username}': {e}")
         return None
+    if entry is None:
+        logger.debug("Username '{}' não encontrado", username)
+        return None
+    return replace(entry)  # Cópia: alterar o retorno não pode contaminar o cache
 
 def update_password(service: str, new_entry: PasswordEntry) -> bool:
     """Atualiza uma senha existente. Retorna True se bem-sucedido."""
     try:
-        with get_connection() as conn:
-            cursor = conn.execute(
-                """
-                UPDATE passwords 
-                SET service = ?, username = ?, encrypted_password = ?
-                WHERE service = ?
-                """,
+        with _transaction() as conn:
+            rows = conn.execute(
+                UPDATE_SQL,
                 (new_entry.service, new_entry.username, new_entry.encrypted_password, service)
-            )
-            conn.commit()
-            success = cursor.rowcount > 0
-            if success:
-                logger.info(f"Senha atualizada: {service} → {new_entry.service}")
-            else:
-                logger.warning(f"Serviço '{service}' não encontrado para atualização")
-            return success
+            ).fetchall()
+        if not rows:
+            logger.warning(f"Serviço '{service}' não encontrado para atualização")
+            return False
+        new_entry.created_at = rows[0]["created_at"]  # Só após o COMMIT
+        logger.info("Senha atualizada: {} → {}", service, new_entry.service)
+        return True
     except sqlite3.IntegrityError:
         logger.error(f"Conflito ao atualizar serviço '{service}'")
         return False
@@ -160,25 +404,14 @@ def update_password(service: str, new_entry: PasswordEntry) -> bool:
 def delete_password(service: str) -> bool:
     """Remove uma senha. Retorna True se bem-sucedido."""
     try:
-        with get_connection() as conn:
-            cursor = conn.execute(
-                "DELETE FROM passwords WHERE service = ?",
-                (service,)
-            )
-            conn.commit()
+        with _transaction() as conn:
+            cursor = conn.execute(DELETE_SQL, (service,))
             success = cursor.rowcount > 0
             if success:
-                logger.info(f"Senha do serviço '{service}' removida")
+                logger.info("Senha do serviço '{}' removida", service)
             else:
                 logger.warning(f"Serviço '{service}' não encontrado para remoção")
             return success
     except sqlite3.Error as e:
         logger.error(f"Erro ao deletar serviço '{service}': {e}")
         return False
-
-# Inicialização segura
-try:
-    init_db()
-except Exception as e:
-    logger.critical(f"Falha crítica ao inicializar banco de dados: {e}")
-    raise
\ No newline at end of file
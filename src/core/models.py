@@ -1,9 +1,14 @@
 from dataclasses import dataclass
 from datetime import datetime
 
-@dataclass
+@dataclass(slots=True)  # Sem __dict__ por instância
 class PasswordEntry:
     service: str
     username: str
     encrypted_password: bytes
-    created_at: datetime = None  # Será populado pelo banco
\ No newline at end of file
+    created_at: datetime = None  # Será populado pelo banco
+
+    @classmethod
+    def from_row(cls, cursor, row: tuple) -> "PasswordEntry":
+        """row_factory do sqlite3: monta a entrada direto da tupla, na ordem dos campos."""
+        return cls(*row)
@@ -1,4 +1,5 @@
 # src/utils/logger.py
+import os
 from loguru import logger
 from pathlib import Path
 
@@ -6,14 +7,18 @@ from pathlib import Path
 LOG_DIR = Path(__file__).parent.parent / "data" / "logs"
 LOG_DIR.mkdir(exist_ok=True)  # Cria a pasta se não existir
 
+# Nível e fila configuráveis por ambiente (padrão: CLI local, processo único)
+LOG_LEVEL = os.getenv("PASSWORLD_LOG_LEVEL", "INFO")
+LOG_ENQUEUE = os.getenv("PASSWORLD_LOG_ENQUEUE") == "1"  # Ative em produção/multiprocesso
+
 # Configuração global do Loguru
 logger.add(
     LOG_DIR / "passworld.log",  # Arquivo de log
     rotation="10 MB",  # Rota o arquivo a cada 10MB
     retention="30 days",  # Mantém logs por 30 dias
-    level="DEBUG",  # Nível mínimo de log
+    level=LOG_LEVEL,  # Nível mínimo de log
     format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {module}:{function}:{line} - {message}",
-    enqueue=True,  # Thread-safe
+    enqueue=LOG_ENQUEUE,  # Fila só quando necessário (custo de serialização por log)
     compression="zip"  # Compacta logs antigos
 )
 
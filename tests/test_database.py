@@ -0,0 +1,55 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from src.core import database as db
+from src.core.models import PasswordEntry
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Cada teste usa um banco novo em disco e conexões recém-abertas."""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        db.DB_PATH = os.path.join(self._tmpdir.name, "vault.db")
+        db._write_conn = None
+        db._local = threading.local()
+        db._invalidate_cache()
+
+    def tearDown(self):
+        if db._write_conn is not None:
+            db._write_conn.close()
+        db._write_conn = None
+        db._local = threading.local()
+        self._tmpdir.cleanup()
+
+    def _run_with_timeout(self, target, timeout=5):
+        """Roda target numa thread; falha (em vez de travar a suíte) se houver deadlock."""
+        result = []
+        worker = threading.Thread(target=lambda: result.append(target()), daemon=True)
+        worker.start()
+        worker.join(timeout)
+        self.assertFalse(worker.is_alive(), "deadlock: create_passwords não terminou")
+        return result[0]
+
+    def test_read_inside_create_passwords_generator(self):
+        source = [PasswordEntry("a", "u", b"1"), PasswordEntry("b", "u", b"2")]
+        inserted = self._run_with_timeout(lambda: db.create_passwords(
+            e for e in source if db.read_password_by_service(e.service) is None
+        ))
+        self.assertEqual(inserted, 2)
+        self.assertEqual(db.read_password_by_service("a").encrypted_password, b"1")
+
+    def test_iter_passwords_inside_create_passwords_generator(self):
+        db.create_passwords([PasswordEntry("a", "u", b"1"), PasswordEntry("b", "u", b"2")])
+        inserted = self._run_with_timeout(lambda: db.create_passwords(
+            PasswordEntry(e.service + "-copy", e.username, e.encrypted_password)
+            for e in db.iter_passwords()
+        ))
+        self.assertEqual(inserted, 2)
+        self.assertEqual(len(db.read_all_passwords()), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()